@@ -37,7 +37,9 @@ def visualize_data():
     T_world2cam = None
     for instance in data["instances"]:
         if T_world2cam is None:
-            T_world2cam = np.linalg.inv(instance["T_cam2world"])
+            T_world2cam = morefusion.geometry.invert_transform(
+                instance["T_cam2world"]
+            )
 
         class_id = instance["class_id"]
         transform = instance["transform_init"]
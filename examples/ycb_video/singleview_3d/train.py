@@ -197,6 +197,11 @@ def main():
         action="store_true",
         help="pretrained resnet18",
     )
+    parser.add_argument(
+        "--mixed-precision",
+        action="store_true",
+        help="fp16 rgb feature extractor",
+    )
     parser.add_argument(
         "--resume", help="resume",
     )
@@ -332,6 +337,7 @@ def main():
         with_occupancy=args.with_occupancy,
         loss=loss,
         loss_scale=args.loss_scale,
+        mixed_precision=args.mixed_precision,
     )
     if args.pretrained_model is not None:
         chainer.serializers.load_npz(args.pretrained_model, model)
@@ -340,6 +346,9 @@ def main():
 
     # optimizer initialization
     optimizer = chainer.optimizers.Adam(alpha=args.lr)
+    if args.mixed_precision:
+        optimizer.loss_scaling()
+        optimizer.use_fp32_update()  # fp32 master weights for fp16 params
     if args.multi_node:
         optimizer = chainermn.create_multi_node_optimizer(optimizer, comm)
     optimizer.setup(model)
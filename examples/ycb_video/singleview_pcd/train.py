@@ -41,6 +41,8 @@ def transform(in_data):
         np.float32
     )
 
+    in_data.pop("valid", None)
+
     in_data.pop("pitch")
     in_data.pop("origin")
 
@@ -64,7 +64,7 @@ def generate_a_video(out, random_state, connection_method=None):
         cad_ids = generator.unique_ids_to_cad_ids(instance_ids)
         class_ids = generator.unique_ids_to_class_ids(instance_ids)
         Ts_cad2world = generator.unique_ids_to_poses(instance_ids)
-        T_world2cam = np.linalg.inv(T_cam2world)
+        T_world2cam = morefusion.geometry.invert_transform(T_cam2world)
         Ts_cad2cam = T_world2cam @ Ts_cad2world
 
         # validation
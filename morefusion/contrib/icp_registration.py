@@ -1,6 +1,7 @@
 import numpy as np
 import open3d
-import trimesh.transformations as tf
+
+from ..geometry import invert_transform
 
 
 class ICPRegistration:
@@ -33,11 +34,11 @@ class ICPRegistration:
             source,  # points_from_depth
             target,  # points_from_cad
             2 * voxel_size,
-            tf.inverse_matrix(self._transform),
+            invert_transform(self._transform),
             open3d.TransformationEstimationPointToPoint(False),
             open3d.ICPConvergenceCriteria(max_iteration=iteration),
         )
-        return tf.inverse_matrix(result.transformation)
+        return invert_transform(result.transformation)
 
     def register_iterative(self, iteration=None, voxel_size=None):
         iteration = 100 if iteration is None else iteration
@@ -51,7 +52,7 @@ class ICPRegistration:
                 source,  # points_from_depth
                 target,  # points_from_cad
                 2 * voxel_size,
-                tf.inverse_matrix(self._transform),
+                invert_transform(self._transform),
                 open3d.TransformationEstimationPointToPoint(False),
                 open3d.ICPConvergenceCriteria(max_iteration=1),
             )
@@ -59,5 +60,5 @@ class ICPRegistration:
                 f"[{i:08d}] fitness={result.fitness:.2g} "
                 f"inlier_rmse={result.inlier_rmse:.2g}"
             )
-            self._transform = tf.inverse_matrix(result.transformation)
+            self._transform = invert_transform(result.transformation)
             yield self._transform
@@ -95,9 +95,13 @@ class Model(chainer.Chain):
         assert H == W == 256
         assert C == 3
 
-        # prepare
-        rgb = rgb.transpose(0, 3, 1, 2).astype(np.float32)  # BHWC -> BCHW
-        pcd = pcd.transpose(0, 3, 1, 2).astype(np.float32)  # BHW3 -> B3HW
+        # prepare: one contiguous copy fusing the cast and the transpose
+        rgb = xp.ascontiguousarray(
+            rgb.transpose(0, 3, 1, 2), dtype=np.float32
+        )  # BHWC -> BCHW
+        pcd = xp.ascontiguousarray(
+            pcd.transpose(0, 3, 1, 2), dtype=np.float32
+        )  # BHW3 -> B3HW
 
         # feature extraction
         h_rgb = self.resnet_extractor(rgb)  # 1/8
@@ -134,8 +138,6 @@ class Model(chainer.Chain):
         if origin is None:
             origin = [None] * B
 
-        voxelized = []
-        count = []
         for i in range(B):
             if pitch[i] is None:
                 pitch[i] = self._models.get_voxel_pitch(
@@ -144,23 +146,29 @@ class Model(chainer.Chain):
             if origin[i] is None:
                 center_i = morefusion.extra.cupy.median(points[i], axis=0)
                 origin[i] = center_i - pitch[i] * (self._voxel_dim / 2.0 - 0.5)
-            (
-                voxelized_i,
-                count_i,
-            ) = morefusion.functions.average_voxelization_3d(
-                values=values[i],
-                points=points[i],
-                origin=origin[i],
-                pitch=pitch[i],
-                dimensions=dimensions,
-                return_counts=True,
-            )
-            voxelized.append(voxelized_i)
-            count.append(count_i)
         pitch = xp.asarray(pitch, dtype=np.float32)
         origin = xp.stack(origin).astype(np.float32)
-        voxelized = F.stack(voxelized)
-        count = xp.stack(count)
+
+        n_points = [points_i.shape[0] for points_i in points]
+        batch_indices = xp.asarray(
+            np.repeat(np.arange(B), n_points).astype(np.int32)
+        )
+        values = F.concat(values, axis=0)  # (P, C)
+        points = xp.concatenate(points, axis=0)  # (P, 3)
+
+        # camera frame -> voxel grid frame
+        points = (points - origin[batch_indices]) / pitch[batch_indices, None]
+
+        voxelized, count = morefusion.functions.average_voxelization_3d(
+            values=values,
+            points=points,
+            batch_indices=batch_indices,
+            batch_size=B,
+            origin=(0, 0, 0),
+            pitch=1.0,
+            dimensions=dimensions,
+            return_counts=True,
+        )  # voxelized: (B, C, X, Y, Z), count: (B, X, Y, Z)
 
         if grid_nontarget_empty is not None:
             grid_nontarget_empty = grid_nontarget_empty.astype(np.float32)
@@ -324,29 +332,27 @@ class Model(chainer.Chain):
         quaternion_true = quaternion_true.astype(np.float32)
         translation_true = translation_true.astype(np.float32)
 
+        M = quaternion_pred.shape[1]
+        T_cad2cam_true = morefusion.functions.transformation_matrix(
+            quaternion_true, translation_true
+        )  # (B, 4, 4)
+        T_cad2cam_pred = morefusion.functions.transformation_matrix(
+            quaternion_pred.reshape(B * M, 4),
+            translation_pred.reshape(B * M, 3),
+        ).reshape(B, M, 4, 4)  # (B, M, 4, 4)
+
         loss = 0
         for i in range(B):
-            n_point = quaternion_pred[i].shape[0]
-
-            T_cad2cam_pred = morefusion.functions.transformation_matrix(
-                quaternion_pred[i], translation_pred[i]
-            )  # (M, 4, 4)
-
-            T_cad2cam_true = morefusion.functions.transformation_matrix(
-                quaternion_true[i], translation_true[i]
-            )  # (4, 4)
-            T_cad2cam_true = F.repeat(T_cad2cam_true[None], n_point, axis=0)
-
             class_id_i = int(class_id[i])
             is_symmetric = (
                 class_id_i in morefusion.datasets.ycb_video.class_ids_symmetric
             )
             cad_pcd = self._models.get_pcd(class_id=class_id_i)
             cad_pcd = xp.asarray(cad_pcd, dtype=np.float32)
-            add = morefusion.functions.average_distance_l1(
+            add = morefusion.functions.average_distance(
                 cad_pcd,
-                T_cad2cam_true,
-                T_cad2cam_pred,
+                T_cad2cam_true[i],
+                T_cad2cam_pred[i],
                 symmetric=is_symmetric,
             )
 
@@ -367,6 +373,7 @@ class VoxelFeatureExtractor(chainer.Chain):
     def __init__(self, n_point, with_count):
         self._n_point = n_point
         self._with_count = with_count
+        self._to_center = None
         super().__init__()
         with self.init_scope():
             C = [None, 32, 64, 128, 256, 512]
@@ -385,11 +392,16 @@ class VoxelFeatureExtractor(chainer.Chain):
         B, _, X, Y, Z = h.shape
         xp = self.xp
 
-        h_ind = xp.stack(xp.meshgrid(xp.arange(X), xp.arange(Y), xp.arange(Z)))
-        h_ind = h_ind[None].repeat(B, axis=0)
         assert X == Y == Z == 32
-        h_ind = (X / 2.0 - 0.5) - h_ind.astype(np.float32)
-        assert h_ind.shape == (B, 3, X, Y, Z)
+        if (
+            self._to_center is None
+            or cuda.get_array_module(self._to_center) is not xp
+        ):
+            ind = xp.stack(
+                xp.meshgrid(xp.arange(X), xp.arange(Y), xp.arange(Z))
+            )
+            self._to_center = ((X / 2.0 - 0.5) - ind.astype(np.float32))[None]
+        h_ind = xp.broadcast_to(self._to_center, (B, 3, X, Y, Z))
 
         h_count = count.astype(np.float32)[:, None, :, :, :]
 
@@ -424,12 +436,17 @@ class VoxelFeatureExtractor(chainer.Chain):
         h_conv5 = h
         assert h_conv5.shape == (B, 512, 1, 1, 1)
 
-        values = []
         points = []
         for i in range(B):
             I, J, K = xp.nonzero(count[i])
             n_point = len(I)
-            if n_point >= self._n_point:
+            if n_point == self._n_point:
+                # nothing to subsample or pad
+                keep = xp.arange(n_point)
+            elif n_point == 1:
+                # padding can only ever repeat the single point
+                keep = xp.zeros(self._n_point, dtype=np.intp)
+            elif n_point > self._n_point:
                 keep = xp.random.permutation(n_point)[: self._n_point]
             else:
                 keep = xp.r_[
@@ -437,33 +454,35 @@ class VoxelFeatureExtractor(chainer.Chain):
                     xp.random.randint(0, n_point, self._n_point - n_point),
                 ]
             assert keep.shape == (self._n_point,)
-            I, J, K = I[keep], J[keep], K[keep]
-            # indices = xp.column_stack((I, J, K)).astype(np.float32)
-            values_i = F.concat(
-                [
-                    h_conv1[i, :, I, J, K],
-                    h_conv2[i, :, I // 2, J // 2, K // 2],
-                    h_conv3[i, :, I // 4, J // 4, K // 4],
-                    h_conv4[i, :, I // 8, J // 8, K // 8],
-                    # morefusion.functions.interpolate_voxel_grid(
-                    #     h_conv2[i], indices / 2.
-                    # ),
-                    # morefusion.functions.interpolate_voxel_grid(
-                    #     h_conv3[i], indices / 4.
-                    # ),
-                    # morefusion.functions.interpolate_voxel_grid(
-                    #     h_conv4[i], indices / 8.
-                    # ),
-                    F.repeat(
-                        h_conv5[i, :, 0, 0, 0][None], self._n_point, axis=0
-                    ),
-                ],
-                axis=1,
-            )
-            values.append(values_i)
-            points.append(xp.column_stack((I, J, K)))
-        values = F.stack(values)
-        points = xp.stack(points)
+            points.append(xp.column_stack((I[keep], J[keep], K[keep])))
+        points = xp.stack(points)  # (B, M, 3)
+
+        # gather the multi-scale features of all samples in one shot
+        batch_indices = xp.arange(B).repeat(self._n_point)
+        I = points[:, :, 0].ravel()
+        J = points[:, :, 1].ravel()
+        K = points[:, :, 2].ravel()
+        # indices = xp.column_stack((I, J, K)).astype(np.float32)
+        values = F.concat(
+            [
+                h_conv1[batch_indices, :, I, J, K],
+                h_conv2[batch_indices, :, I // 2, J // 2, K // 2],
+                h_conv3[batch_indices, :, I // 4, J // 4, K // 4],
+                h_conv4[batch_indices, :, I // 8, J // 8, K // 8],
+                # morefusion.functions.interpolate_voxel_grid(
+                #     h_conv2, indices / 2., batch_indices,
+                # ),
+                # morefusion.functions.interpolate_voxel_grid(
+                #     h_conv3, indices / 4., batch_indices,
+                # ),
+                # morefusion.functions.interpolate_voxel_grid(
+                #     h_conv4, indices / 8., batch_indices,
+                # ),
+                h_conv5[batch_indices, :, 0, 0, 0],
+            ],
+            axis=1,
+        )  # (B * M, C)
+        values = values.reshape(B, self._n_point, -1)
 
         values = values.transpose(0, 2, 1)  # BMC -> BCM
         points = points.transpose(0, 2, 1)  # BM3 -> B3M
@@ -24,11 +24,20 @@ class Model(chainer.Chain):
         with_occupancy=False,
         loss=None,
         loss_scale=None,
+        mixed_precision=False,
     ):
         super().__init__()
 
+        if mixed_precision:
+            assert (
+                not pretrained_resnet18
+            ), "mixed_precision is unsupported with pretrained_resnet18"
+
         self._n_fg_class = n_fg_class
         self._with_occupancy = with_occupancy
+        self._mixed_precision = mixed_precision
+        self._cad_pcd_cache = {}
+        self._rng = np.random.default_rng()
 
         if loss is None:
             loss = "add/add_s"
@@ -47,16 +56,22 @@ class Model(chainer.Chain):
         self._loss_scale = loss_scale
 
         with self.init_scope():
-            # extractor
-            if pretrained_resnet18:
-                self.resnet_extractor = morefusion.models.ResNet18Extractor()
-            else:
-                self.resnet_extractor = (
-                    morefusion.models.dense_fusion.ResNet18()
-                )
-            self.pspnet_extractor = (
-                morefusion.models.dense_fusion.PSPNetExtractor()
+            # extractor (optionally fp16 for the conv-heavy 2D stack)
+            dtype = (
+                chainer.mixed16 if mixed_precision else chainer.config.dtype
             )
+            with chainer.using_config("dtype", dtype):
+                if pretrained_resnet18:
+                    self.resnet_extractor = (
+                        morefusion.models.ResNet18Extractor()
+                    )
+                else:
+                    self.resnet_extractor = (
+                        morefusion.models.dense_fusion.ResNet18()
+                    )
+                self.pspnet_extractor = (
+                    morefusion.models.dense_fusion.PSPNetExtractor()
+                )
 
             # conv1
             self.conv1_rgb = L.Convolution1D(32, 64, 1)
@@ -73,23 +88,37 @@ class Model(chainer.Chain):
             self.conv3 = L.Convolution3D(None, 256, 4, 2, pad=1)
             self.conv4 = L.Convolution3D(256, 512, 4, 2, pad=1)
 
+            # rot and trans run as one grouped convolution per stage
             # conv1
-            self.conv1_rot = L.Convolution1D(None, 640, 1)
-            self.conv1_trans = L.Convolution1D(None, 640, 1)
+            self.conv1_rot_trans = L.Convolution1D(
+                None, 2 * 640, 1, groups=2
+            )
             self.conv1_conf = L.Convolution1D(None, 640, 1)
             # conv2
-            self.conv2_rot = L.Convolution1D(640, 256, 1)
-            self.conv2_trans = L.Convolution1D(640, 256, 1)
+            self.conv2_rot_trans = L.Convolution1D(
+                2 * 640, 2 * 256, 1, groups=2
+            )
             self.conv2_conf = L.Convolution1D(640, 256, 1)
             # conv3
-            self.conv3_rot = L.Convolution1D(256, 128, 1)
-            self.conv3_trans = L.Convolution1D(256, 128, 1)
+            self.conv3_rot_trans = L.Convolution1D(
+                2 * 256, 2 * 128, 1, groups=2
+            )
             self.conv3_conf = L.Convolution1D(256, 128, 1)
             # conv4
             self.conv4_rot = L.Convolution1D(128, n_fg_class * 4, 1)
             self.conv4_trans = L.Convolution1D(128, n_fg_class * 3, 1)
             self.conv4_conf = L.Convolution1D(128, n_fg_class, 1)
 
+    def _get_cad_pcd(self, class_id):
+        if class_id not in self._cad_pcd_cache:
+            cad_pcd = self._models.get_pcd(class_id=class_id)
+            self._cad_pcd_cache[class_id] = cad_pcd.astype(np.float32)
+        cad_pcd = self._cad_pcd_cache[class_id]
+        if cuda.get_array_module(cad_pcd) is not self.xp:
+            cad_pcd = self.xp.asarray(cad_pcd)
+            self._cad_pcd_cache[class_id] = cad_pcd
+        return cad_pcd
+
     def _extract(self, values, points, grid_nontarget_empty):
         B, _, P = values.shape
 
@@ -169,86 +198,109 @@ class Model(chainer.Chain):
         class_id,
         rgb,
         pcd,
+        valid=None,
         pitch=None,
         origin=None,
         grid_nontarget_empty=None,
     ):
         xp = self.xp
         B, H, W, C = rgb.shape
-        mask = ~xp.isnan(pcd).any(axis=3)  # BHW
-
-        # prepare
-        rgb = rgb.astype(np.float32).transpose(0, 3, 1, 2)  # BHWC -> BCHW
-        pcd = pcd.astype(np.float32).transpose(0, 3, 1, 2)  # BHWC -> BCHW
-
-        h_rgb = self.resnet_extractor(rgb)
+        if valid is None:
+            mask = ~xp.isnan(pcd).any(axis=3)  # BHW
+        else:
+            mask = valid.astype(bool)  # BHW
+
+        # prepare: one contiguous copy fusing the cast and the transpose
+        rgb = xp.ascontiguousarray(
+            rgb.transpose(0, 3, 1, 2), dtype=np.float32
+        )  # BHWC -> BCHW
+        pcd = xp.ascontiguousarray(
+            pcd.transpose(0, 3, 1, 2), dtype=np.float32
+        )  # BHWC -> BCHW
+
+        h_rgb = rgb
+        if self._mixed_precision:
+            h_rgb = h_rgb.astype(np.float16)
+        h_rgb = self.resnet_extractor(h_rgb)
         h_rgb = self.pspnet_extractor(h_rgb)  # 1/1
-
-        if pitch is None:
-            pitch = [None] * B
-        if origin is None:
-            origin = [None] * B
+        if self._mixed_precision:
+            # geometry and voxelization stay in fp32
+            h_rgb = F.cast(h_rgb, np.float32)
+
+        pitch_given = pitch is not None
+        origin_given = origin is not None
+        if pitch_given:
+            pitch = xp.asarray(pitch, dtype=np.float32)
+        else:
+            pitch = xp.empty((B,), dtype=np.float32)
+        if origin_given:
+            origin = xp.asarray(origin, dtype=np.float32)
+        else:
+            origin = xp.empty((B, 3), dtype=np.float32)
 
         # extract indices
+        # the points are plain arrays and are written into a preallocated
+        # buffer; the rgb features are Variables, so they keep F.stack
         values = []
-        points = []
+        points = xp.empty((B, 3, self._n_point), dtype=np.float32)
         for i in range(B):
             iy, ix = xp.where(mask[i])
-            if pitch[i] is None:
+            if not pitch_given:
                 pitch[i] = self._models.get_voxel_pitch(
                     dimension=self._voxel_dim, class_id=int(class_id[i])
                 )
-            if origin[i] is None:
+            if not origin_given:
                 center_i = morefusion.extra.cupy.median(
                     pcd[i, :, iy, ix], axis=0
                 )
                 origin[i] = center_i - pitch[i] * (self._voxel_dim / 2.0 - 0.5)
 
             n_point = int(mask[i].sum())
-            if chainer.config.train:
-                random_state = np.random.mtrand._rand
-            else:
-                random_state = np.random.RandomState(1234)
-            if n_point >= self._n_point:
-                keep = random_state.permutation(n_point)[: self._n_point]
+            if n_point == self._n_point:
+                # nothing to subsample or pad
+                keep = np.arange(n_point)
+            elif n_point == 1:
+                # padding can only ever repeat the single point
+                keep = np.zeros(self._n_point, dtype=np.intp)
             else:
-                keep = np.r_[
-                    np.arange(n_point),
-                    random_state.randint(0, n_point, self._n_point - n_point),
-                ]
+                if chainer.config.train:
+                    random_state = np.random.mtrand._rand
+                else:
+                    random_state = np.random.RandomState(1234)
+                if n_point > self._n_point:
+                    keep = random_state.permutation(n_point)[: self._n_point]
+                else:
+                    keep = np.r_[
+                        np.arange(n_point),
+                        random_state.randint(
+                            0, n_point, self._n_point - n_point
+                        ),
+                    ]
             assert keep.shape == (self._n_point,)
             iy, ix = iy[keep], ix[keep]
 
             values_i = h_rgb[i, :, iy, ix]  # CHW -> PC, P = self._n_point
-            points_i = pcd[i, :, iy, ix]  # CHW -> PC
-
             values_i = values_i.transpose(1, 0)  # PC -> CP
-            points_i = points_i.transpose(1, 0)  # PC -> CP
-
             values.append(values_i)
-            points.append(points_i)
-        pitch = xp.asarray(pitch, dtype=np.float32)
-        origin = xp.asarray(origin, dtype=np.float32)
+
+            points[i] = pcd[i, :, iy, ix].T  # CHW -> PC -> CP
         values = F.stack(values)
-        points = xp.stack(points)
 
         # camera frame -> voxel grid frame
         points = (points - origin[:, :, None]) / pitch[:, None, None]
         h = self._extract(values, points, grid_nontarget_empty)
 
         # conv1
-        h_rot = F.relu(self.conv1_rot(h))
-        h_trans = F.relu(self.conv1_trans(h))
+        h_rot_trans = F.relu(self.conv1_rot_trans(F.concat((h, h), axis=1)))
         h_conf = F.relu(self.conv1_conf(h))
         # conv2
-        h_rot = F.relu(self.conv2_rot(h_rot))
-        h_trans = F.relu(self.conv2_trans(h_trans))
+        h_rot_trans = F.relu(self.conv2_rot_trans(h_rot_trans))
         h_conf = F.relu(self.conv2_conf(h_conf))
         # conv3
-        h_rot = F.relu(self.conv3_rot(h_rot))
-        h_trans = F.relu(self.conv3_trans(h_trans))
+        h_rot_trans = F.relu(self.conv3_rot_trans(h_rot_trans))
         h_conf = F.relu(self.conv3_conf(h_conf))
         # conv4
+        h_rot, h_trans = F.split_axis(h_rot_trans, 2, axis=1)
         cls_rot = self.conv4_rot(h_rot)
         cls_trans = self.conv4_trans(h_trans)
         cls_conf = F.sigmoid(self.conv4_conf(h_conf))
@@ -282,6 +334,7 @@ class Model(chainer.Chain):
         pcd,
         quaternion_true,
         translation_true,
+        valid=None,
         pitch=None,
         origin=None,
         grid_target=None,
@@ -294,11 +347,19 @@ class Model(chainer.Chain):
             class_id=class_id,
             rgb=rgb,
             pcd=pcd,
+            valid=valid,
             pitch=pitch,
             origin=origin,
             grid_nontarget_empty=grid_nontarget_empty,
         )
 
+        # the true transform is shared by evaluate and loss
+        with chainer.no_backprop_mode():
+            T_cad2cam_true = morefusion.functions.transformation_matrix(
+                quaternion_true.astype(np.float32),
+                translation_true.astype(np.float32),
+            ).array  # (B, 4, 4)
+
         indices = F.argmax(confidence_pred, axis=1).array
         self.evaluate(
             class_id=class_id,
@@ -306,12 +367,14 @@ class Model(chainer.Chain):
             translation_true=translation_true,
             quaternion_pred=quaternion_pred[xp.arange(B), indices],
             translation_pred=translation_pred[xp.arange(B), indices],
+            T_cad2cam_true=T_cad2cam_true,
         )
 
         loss = self.loss(
             class_id=class_id,
             quaternion_true=quaternion_true,
             translation_true=translation_true,
+            T_cad2cam_true=T_cad2cam_true,
             quaternion_pred=quaternion_pred,
             translation_pred=translation_pred,
             confidence_pred=confidence_pred,
@@ -330,48 +393,67 @@ class Model(chainer.Chain):
         translation_true,
         quaternion_pred,
         translation_pred,
+        T_cad2cam_true=None,
     ):
-        quaternion_true = quaternion_true.astype(np.float32)
-        translation_true = translation_true.astype(np.float32)
-
-        B = class_id.shape[0]
+        xp = self.xp
 
-        T_cad2cam_true = morefusion.functions.transformation_matrix(
-            quaternion_true, translation_true
-        )
-        T_cad2cam_pred = morefusion.functions.transformation_matrix(
-            quaternion_pred, translation_pred
-        )
-        T_cad2cam_true = cuda.to_cpu(T_cad2cam_true.array)
-        T_cad2cam_pred = cuda.to_cpu(T_cad2cam_pred.array)
+        with chainer.no_backprop_mode():
+            if T_cad2cam_true is None:
+                T_cad2cam_true = morefusion.functions.transformation_matrix(
+                    quaternion_true.astype(np.float32),
+                    translation_true.astype(np.float32),
+                ).array
+            T_cad2cam_pred = morefusion.functions.transformation_matrix(
+                quaternion_pred, translation_pred
+            ).array
 
         summary = chainer.DictSummary()
-        for i in range(B):
-            class_id_i = int(class_id[i])
-            cad_pcd = self._models.get_pcd(class_id=class_id_i)
-            add, add_s = morefusion.metrics.average_distance(
-                points=[cad_pcd],
-                transform1=[T_cad2cam_true[i]],
-                transform2=[T_cad2cam_pred[i]],
-            )
-            add, add_s = add[0], add_s[0]
+        class_id = cuda.to_cpu(class_id)
+        for class_id_i in np.unique(class_id):
+            class_id_i = int(class_id_i)
+            (indices,) = np.where(class_id == class_id_i)
+            cad_pcd = self._get_cad_pcd(class_id_i)
+            with chainer.no_backprop_mode():
+                adds = morefusion.functions.average_distance(
+                    cad_pcd,
+                    T_cad2cam_true[indices],
+                    T_cad2cam_pred[indices],
+                ).array
+                add_ss = xp.stack(
+                    [
+                        morefusion.functions.average_distance(
+                            cad_pcd,
+                            T_cad2cam_true[i],
+                            T_cad2cam_pred[i][None],
+                            symmetric=True,
+                        ).array[0]
+                        for i in indices
+                    ]
+                )
+            adds = cuda.to_cpu(adds)
+            add_ss = cuda.to_cpu(add_ss)
             is_symmetric = (
                 class_id_i in morefusion.datasets.ycb_video.class_ids_symmetric
             )
-            add_or_add_s = add_s if is_symmetric else add
-            if chainer.config.train:
-                summary.add(
-                    {"add": add, "add_s": add_s, "add_or_add_s": add_or_add_s}
-                )
-            else:
-                instance_id_i = uuid.uuid1()
-                summary.add(
-                    {
-                        f"add/{class_id_i:04d}/{instance_id_i}": add,
-                        f"add_s/{class_id_i:04d}/{instance_id_i}": add_s,
-                        f"add_or_add_s/{class_id_i:04d}/{instance_id_i}": add_or_add_s,  # NOQA
-                    }
-                )
+            for add, add_s in zip(adds, add_ss):
+                add_or_add_s = add_s if is_symmetric else add
+                if chainer.config.train:
+                    summary.add(
+                        {
+                            "add": add,
+                            "add_s": add_s,
+                            "add_or_add_s": add_or_add_s,
+                        }
+                    )
+                else:
+                    instance_id_i = uuid.uuid1()
+                    summary.add(
+                        {
+                            f"add/{class_id_i:04d}/{instance_id_i}": add,
+                            f"add_s/{class_id_i:04d}/{instance_id_i}": add_s,
+                            f"add_or_add_s/{class_id_i:04d}/{instance_id_i}": add_or_add_s,  # NOQA
+                        }
+                    )
         chainer.report(summary.compute_mean(), self)
 
     def loss(
@@ -386,13 +468,12 @@ class Model(chainer.Chain):
         origin=None,
         grid_target=None,
         grid_nontarget_empty=None,
+        T_cad2cam_true=None,
     ):
         xp = self.xp
         B = class_id.shape[0]
 
         # prepare
-        quaternion_true = quaternion_true.astype(np.float32)
-        translation_true = translation_true.astype(np.float32)
         if pitch is not None:
             pitch = pitch.astype(np.float32)
         if origin is not None:
@@ -402,20 +483,30 @@ class Model(chainer.Chain):
         if grid_nontarget_empty is not None:
             grid_nontarget_empty = grid_nontarget_empty.astype(np.float32)
 
-        loss = 0
-        for i in range(B):
-            T_cad2cam_pred = morefusion.functions.transformation_matrix(
-                quaternion_pred[i], translation_pred[i]
-            )  # (P, 4, 4)
-
-            T_cad2cam_true = morefusion.functions.transformation_matrix(
-                quaternion_true[i], translation_true[i]
-            )  # (4, 4)
+        P = quaternion_pred.shape[1]
+        if T_cad2cam_true is None:
+            with chainer.no_backprop_mode():
+                T_cad2cam_true = morefusion.functions.transformation_matrix(
+                    quaternion_true.astype(np.float32),
+                    translation_true.astype(np.float32),
+                ).array  # (B, 4, 4)
+        T_cad2cam_pred = morefusion.functions.transformation_matrix(
+            quaternion_pred.reshape(B * P, 4),
+            translation_pred.reshape(B * P, 3),
+        ).reshape(B, P, 4, 4)  # (B, P, 4, 4)
 
-            class_id_i = int(class_id[i])
-            cad_pcd = self._models.get_pcd(class_id=class_id_i)
-            cad_pcd = cad_pcd[np.random.permutation(cad_pcd.shape[0])[:500]]
-            cad_pcd = xp.asarray(cad_pcd, dtype=np.float32)
+        class_id_cpu = cuda.to_cpu(class_id)
+        loss = 0
+        for class_id_i in np.unique(class_id_cpu):
+            class_id_i = int(class_id_i)
+            (indices,) = np.where(class_id_cpu == class_id_i)
+
+            cad_pcd = self._get_cad_pcd(class_id_i)
+            n_point = cad_pcd.shape[0]
+            keep = self._rng.choice(
+                n_point, min(500, n_point), replace=False
+            )
+            cad_pcd = cad_pcd[keep]
 
             is_symmetric = (
                 class_id_i in morefusion.datasets.ycb_video.class_ids_symmetric
@@ -426,53 +517,71 @@ class Model(chainer.Chain):
                 is_symmetric = True
             else:
                 assert self._loss in ["add/add_s", "add/add_s+occupancy"]
-            add = morefusion.functions.average_distance(
-                cad_pcd,
-                T_cad2cam_true,
-                T_cad2cam_pred,
-                symmetric=is_symmetric,
-            )
-            del cad_pcd, T_cad2cam_true, is_symmetric
 
-            keep = confidence_pred[i].array > 0
-            loss_i = F.mean(
-                add[keep] * confidence_pred[i][keep]
-                - self._lambda_confidence * F.log(confidence_pred[i][keep])
-            )
-
-            if self._loss in ["add+occupancy", "add/add_s+occupancy"]:
-                solid_pcd = self._models.get_solid_voxel_grid(
-                    class_id=class_id_i
-                )
-                solid_pcd = xp.asarray(solid_pcd.points, dtype=np.float32)
-                kwargs = dict(
-                    pitch=float(pitch[i]),
-                    origin=cuda.to_cpu(origin[i]),
-                    dims=(self._voxel_dim,) * 3,
-                    threshold=2.0,
-                )
-                grid_target_pred = morefusion.functions.pseudo_occupancy_voxelization(  # NOQA
-                    points=morefusion.functions.transform_points(
-                        solid_pcd, T_cad2cam_pred[i]
-                    ),
-                    **kwargs,
-                )
-                # give reward intersection w/ target voxels
-                intersection = F.sum(grid_target_pred * grid_target[i])
-                denominator = F.sum(grid_target[i]) + 1e-16
-                loss_i -= (
-                    self._loss_scale["occupancy"] * intersection / denominator
-                )
-                # penalize intersection w/ nontarget voxels
-                intersection = F.sum(
-                    grid_target_pred * grid_nontarget_empty[i]
+            if is_symmetric:
+                # nearest-neighbor assignment is per-sample
+                adds = [
+                    morefusion.functions.average_distance(
+                        cad_pcd,
+                        T_cad2cam_true[i],
+                        T_cad2cam_pred[i],
+                        symmetric=True,
+                    )
+                    for i in indices
+                ]
+            else:
+                K = len(indices)
+                add = morefusion.functions.average_distance(
+                    cad_pcd,
+                    F.repeat(T_cad2cam_true[indices], P, axis=0),
+                    T_cad2cam_pred[indices].reshape(K * P, 4, 4),
                 )
-                denominator = F.sum(grid_target_pred) + 1e-16
-                loss_i += (
-                    self._loss_scale["occupancy"] * intersection / denominator
+                adds = F.separate(add.reshape(K, P), axis=0)
+
+            for i, add in zip(indices, adds):
+                keep = confidence_pred[i].array > 0
+                loss_i = F.mean(
+                    add[keep] * confidence_pred[i][keep]
+                    - self._lambda_confidence * F.log(confidence_pred[i][keep])
                 )
 
-            loss += loss_i
+                if self._loss in ["add+occupancy", "add/add_s+occupancy"]:
+                    solid_pcd = self._models.get_solid_voxel_grid(
+                        class_id=class_id_i
+                    )
+                    solid_pcd = xp.asarray(solid_pcd.points, dtype=np.float32)
+                    kwargs = dict(
+                        pitch=float(pitch[i]),
+                        origin=cuda.to_cpu(origin[i]),
+                        dims=(self._voxel_dim,) * 3,
+                        threshold=2.0,
+                    )
+                    grid_target_pred = morefusion.functions.pseudo_occupancy_voxelization(  # NOQA
+                        points=morefusion.functions.transform_points(
+                            solid_pcd, T_cad2cam_pred[i, i]
+                        ),
+                        **kwargs,
+                    )
+                    # give reward intersection w/ target voxels
+                    intersection = F.sum(grid_target_pred * grid_target[i])
+                    denominator = F.sum(grid_target[i]) + 1e-16
+                    loss_i -= (
+                        self._loss_scale["occupancy"]
+                        * intersection
+                        / denominator
+                    )
+                    # penalize intersection w/ nontarget voxels
+                    intersection = F.sum(
+                        grid_target_pred * grid_nontarget_empty[i]
+                    )
+                    denominator = F.sum(grid_target_pred) + 1e-16
+                    loss_i += (
+                        self._loss_scale["occupancy"]
+                        * intersection
+                        / denominator
+                    )
+
+                loss += loss_i
         loss /= B
 
         values = {"loss": loss}
@@ -52,27 +52,37 @@ class RGBDPoseEstimationDatasetBase(DatasetBase):
     def _get_grid_full(self, examples, pitch, origin):
         dims = (self._voxel_dim,) * 3
         grid_full = np.zeros(dims, dtype=np.int32)
+        if not examples:
+            return grid_full
+
+        points = []
+        labels = []
         for i, example in enumerate(examples):
             T = tf.quaternion_matrix(example["quaternion_true"])
             T = geometry_module.compose_transform(
                 R=T[:3, :3], t=example["translation_true"]
             )
             vox = self._models.get_solid_voxel_grid(example["class_id"])
-            points = trimesh.transform_points(vox.points, T)
-            indices = trimesh.voxel.ops.points_to_indices(
-                points, pitch=pitch, origin=origin
-            )
-            I, J, K = indices[:, 0], indices[:, 1], indices[:, 2]
-            keep = (
-                (0 <= I)
-                & (I < dims[0])
-                & (0 <= J)
-                & (J < dims[1])
-                & (0 <= K)
-                & (K < dims[2])
-            )
-            I, J, K = I[keep], J[keep], K[keep]
-            grid_full[I, J, K] = i + 1  # starts from 1
+            points.append(vox.points @ T[:3, :3].T + T[:3, 3])
+            labels.append(np.full(len(vox.points), i + 1, dtype=np.int32))
+        # keep the example order: on duplicate voxels the assignment below
+        # lets later examples win, like the per-example loop did
+        points = np.concatenate(points, axis=0)
+        labels = np.concatenate(labels, axis=0)
+
+        indices = trimesh.voxel.ops.points_to_indices(
+            points, pitch=pitch, origin=origin
+        )
+        I, J, K = indices[:, 0], indices[:, 1], indices[:, 2]
+        keep = (
+            (0 <= I)
+            & (I < dims[0])
+            & (0 <= J)
+            & (J < dims[1])
+            & (0 <= K)
+            & (K < dims[2])
+        )
+        grid_full[I[keep], J[keep], K[keep]] = labels[keep]  # starts from 1
         return grid_full
 
     def get_example(self, index):
@@ -128,6 +138,7 @@ class RGBDPoseEstimationDatasetBase(DatasetBase):
                 cval=np.nan,
                 interpolation="nearest",
             )
+            valid = ~np.isnan(pcd_ins).any(axis=2)
 
             rgb_ins = rgb.copy()
             rgb_ins[~mask] = 0
@@ -165,6 +176,7 @@ class RGBDPoseEstimationDatasetBase(DatasetBase):
                 class_id=class_id,
                 rgb=rgb_ins,
                 pcd=pcd_ins,
+                valid=valid,
                 quaternion_true=quaternion_true,
                 translation_true=translation_true,
                 visibility=visibility,
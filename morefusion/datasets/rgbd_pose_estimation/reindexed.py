@@ -162,4 +162,7 @@ class RGBDPoseEstimationDatasetReIndexedBase(DatasetBase):
             example["rgb"], example["pcd"] = self._augment_rgbd(
                 example["rgb"], example["pcd"],
             )
+            if "valid" in example:
+                # augmentation drops points, so refresh the validity mask
+                example["valid"] = ~np.isnan(example["pcd"]).any(axis=2)
         return example
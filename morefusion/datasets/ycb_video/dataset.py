@@ -1,3 +1,4 @@
+import functools
 import typing
 
 import gdown
@@ -81,6 +82,13 @@ class YCBVideoDataset(DatasetBase):
 
     @classmethod
     def get_frame(cls, image_id: str) -> dict:
+        # shallow copy so that callers can add keys without
+        # polluting the cache
+        return dict(cls._get_frame(image_id))
+
+    @classmethod
+    @functools.lru_cache(maxsize=32)
+    def _get_frame(cls, image_id: str) -> dict:
         root_dir = path.Path(cls._root_dir)
 
         meta_file = root_dir / cls._data_dir / (image_id + "-meta.mat")
@@ -18,6 +18,7 @@ class YCBVideoModels(ModelsBase):
     _cad_cache: typing.Dict[str, trimesh.Trimesh] = {}
     _pcd_cache: typing.Dict[str, np.ndarray] = {}
     _sdf_cache: typing.Dict[str, typing.Tuple[np.ndarray, np.ndarray]] = {}
+    _solid_voxel_cache: typing.Dict[str, trimesh.voxel.VoxelGrid] = {}
 
     @property
     def class_names(self):
@@ -79,11 +80,14 @@ class YCBVideoModels(ModelsBase):
         return points, sdf
 
     def get_solid_voxel_grid(self, class_id):
-        cad_file = self.get_cad_file(class_id=class_id)
-        binvox_file = utils_module.get_binvox_file(cad_file)
-        with open(binvox_file, "rb") as f:
-            vg = trimesh.exchange.binvox.load_binvox(f)
-        return vg
+        class_name = self.class_names[class_id]
+        if class_name not in self._solid_voxel_cache:
+            cad_file = self.get_cad_file(class_id=class_id)
+            binvox_file = utils_module.get_binvox_file(cad_file)
+            with open(binvox_file, "rb") as f:
+                vg = trimesh.exchange.binvox.load_binvox(f)
+            self._solid_voxel_cache[class_name] = vg
+        return self._solid_voxel_cache[class_name]
 
     def get_cad(self, class_id):
         class_name = self.class_names[class_id]
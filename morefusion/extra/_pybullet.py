@@ -238,7 +238,7 @@ def get_camera_image(view_matrix, fovy, height, width):
 def render_camera(T_cam2world, fovy, height, width):
     view_matrix = T_cam2world.copy()
     view_matrix[:3, 3] = 0
-    view_matrix[3, :3] = np.linalg.inv(T_cam2world)[:3, 3]
+    view_matrix[3, :3] = geometry.invert_transform(T_cam2world)[:3, 3]
     view_matrix[:, 1] *= -1
     view_matrix[:, 2] *= -1
     view_matrix = view_matrix.flatten()
@@ -267,7 +267,7 @@ def render_cad(visual_file, Ts_cad2cam, fovy, height, width, scale=None):
     depths = []
     masks = []
     for T_cad2cam in Ts_cad2cam:
-        T_cam2cad = np.linalg.inv(T_cad2cam)
+        T_cam2cad = geometry.invert_transform(T_cad2cam)
         rgb, depth, segm = render_camera(
             T_cam2world=T_cam2cad, fovy=fovy, height=height, width=width
         )
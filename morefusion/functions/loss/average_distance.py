@@ -63,14 +63,25 @@ def average_distance(points, transform_true, transforms_pred, symmetric=False):
     n_points = points.shape[0]
     n_pred = transforms_pred.shape[0]
     assert points.shape == (n_points, 3)
-    assert transform_true.shape == (4, 4)
     assert transforms_pred.shape == (n_pred, 4, 4)
 
-    points_true = transform_points(points, transform_true)
     points_pred = transform_points(points, transforms_pred)
-    assert points_true.shape == (n_points, 3)
     assert points_pred.shape == (n_pred, n_points, 3)
 
+    if transform_true.ndim == 3:
+        # one true transform per predicted transform
+        assert transform_true.shape == (n_pred, 4, 4)
+        assert not symmetric, "symmetric requires a single transform_true"
+        points_true = transform_points(points, transform_true)
+        assert points_true.shape == (n_pred, n_points, 3)
+        return F.mean(
+            F.sqrt(F.sum((points_true - points_pred) ** 2, axis=2)), axis=1
+        )
+
+    assert transform_true.shape == (4, 4)
+    points_true = transform_points(points, transform_true)
+    assert points_true.shape == (n_points, 3)
+
     if symmetric:
         ref = points_true.array
         query = points_pred.array.reshape(n_pred * n_points, 3)
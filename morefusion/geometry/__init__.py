@@ -8,6 +8,8 @@ from .estimate_pointcloud_normals import estimate_pointcloud_normals
 
 from .get_aabb_from_points import get_aabb_from_points
 
+from .invert_transform import invert_transform
+
 from .uniform_points_on_sphere import uniform_points_on_sphere
 
 from .look_at import look_at
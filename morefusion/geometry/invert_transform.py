@@ -0,0 +1,29 @@
+import numpy as np
+
+
+def invert_transform(T) -> np.ndarray:
+    """Returns the inverse of a rigid transformation matrix.
+
+    Uses the closed form [[R.T, -R.T @ t], [0, 0, 0, 1]] instead of a
+    general matrix inverse.
+
+    Parameters
+    ----------
+    T: (4, 4) float
+        Rigid (rotation + translation) transformation matrix.
+
+    Returns
+    -------
+    T_inv: (4, 4) float
+        Inverse of the given transformation matrix.
+    """
+    T = np.asarray(T)
+    assert T.shape == (4, 4), "T must be (4, 4) float"
+
+    R = T[:3, :3]
+    t = T[:3, 3]
+
+    T_inv = np.eye(4, dtype=T.dtype)
+    T_inv[:3, :3] = R.T
+    T_inv[:3, 3] = -R.T @ t
+    return T_inv
@@ -1,6 +1,22 @@
 import numpy as np
 
 
+_unproject_cache: dict = {}
+
+
+def _unproject_coefficients(fx, fy, cx, cy, rows, cols) -> np.ndarray:
+    key = (fx, fy, cx, cy, rows, cols)
+    if key not in _unproject_cache:
+        c = np.arange(cols)[None, :]
+        r = np.arange(rows)[:, None]
+        coefficients = np.empty((rows, cols, 3), dtype=np.float64)
+        coefficients[:, :, 0] = (c - cx) / fx
+        coefficients[:, :, 1] = (r - cy) / fy
+        coefficients[:, :, 2] = 1
+        _unproject_cache[key] = coefficients
+    return _unproject_cache[key]
+
+
 def pointcloud_from_depth(
     depth: np.ndarray,
     fx: float,
@@ -13,14 +29,14 @@ def pointcloud_from_depth(
     assert depth.dtype.kind == "f", "depth must be float and have meter values"
 
     rows, cols = depth.shape
-    c, r = np.meshgrid(np.arange(cols), np.arange(rows), sparse=True)
-    valid = ~np.isnan(depth)
-    z = np.where(valid, depth, np.nan)
-    x = np.where(valid, z * (c - cx) / fx, np.nan)
-    y = np.where(valid, z * (r - cy) / fy, np.nan)
-    pc = np.dstack((x, y, z))
+    coefficients = _unproject_coefficients(
+        float(fx), float(fy), float(cx), float(cy), rows, cols
+    )
+    # invalid pixels are nan in depth and nan propagates through the
+    # multiplication, so no masked writes are needed
+    pc = depth[:, :, None] * coefficients
 
     if depth_type == "euclidean":
         norm = np.linalg.norm(pc, axis=2)
-        pc = pc * (z / norm)[:, :, None]
+        pc = pc * (depth / norm)[:, :, None]
     return pc
@@ -1,5 +1,6 @@
 # https://github.com/knorth55/chainer-dense-fusion/blob/44d577495acc839aaecf4811e7d6eccf19482f8e/chainer_dense_fusion/links/model/resnet.py  # NOQA
 import chainer
+from chainer.backends import cuda
 import chainer.functions as F
 import chainer.links as L
 import chainercv
@@ -33,13 +34,21 @@ class ResNet(chainercv.links.PickableSequentialChain):
             self.res4 = ResBlock(blocks[2], 128, 256, 1, 2)
             self.res5 = ResBlock(blocks[3], 256, 512, 1, 4)
 
-        self.mean = np.array(self.mean_rgb, dtype=np.float32)[:, None, None]
-        self.std = np.array(self.std_rgb, dtype=np.float32)[:, None, None]
+        self.mean = np.array(self.mean_rgb, dtype=np.float32)[
+            None, :, None, None
+        ]
+        self.std = np.array(self.std_rgb, dtype=np.float32)[
+            None, :, None, None
+        ]
 
     def __call__(self, x):
-        self.mean = self.xp.asarray(self.mean)
-        self.std = self.xp.asarray(self.std)
-        h = (x / 255.0 - self.mean[None]) / self.std[None]
+        if (
+            cuda.get_array_module(self.mean) is not self.xp
+            or self.mean.dtype != x.dtype
+        ):
+            self.mean = self.xp.asarray(self.mean, dtype=x.dtype)
+            self.std = self.xp.asarray(self.std, dtype=x.dtype)
+        h = (x / 255.0 - self.mean) / self.std
         return super().__call__(h)
 
 
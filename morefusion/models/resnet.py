@@ -1,4 +1,5 @@
 import chainer
+from chainer.backends import cuda
 import numpy as np
 
 from chainercv2.model_provider import get_model
@@ -34,13 +35,21 @@ class ResNet18Extractor(chainer.Chain):
             self.res5.unit2.body.conv2.conv.dilate = (4, 4)
             self.res5.unit2.body.conv2.conv.pad = (4, 4)
 
-        self.mean = np.array(self.mean_rgb, dtype=np.float32)[:, None, None]
-        self.std = np.array(self.std_rgb, dtype=np.float32)[:, None, None]
+        self.mean = np.array(self.mean_rgb, dtype=np.float32)[
+            None, :, None, None
+        ]
+        self.std = np.array(self.std_rgb, dtype=np.float32)[
+            None, :, None, None
+        ]
 
     def __call__(self, x):
-        self.mean = self.xp.asarray(self.mean)
-        self.std = self.xp.asarray(self.std)
-        h = (x / 255.0 - self.mean[None]) / self.std[None]
+        if (
+            cuda.get_array_module(self.mean) is not self.xp
+            or self.mean.dtype != x.dtype
+        ):
+            self.mean = self.xp.asarray(self.mean, dtype=x.dtype)
+            self.std = self.xp.asarray(self.std, dtype=x.dtype)
+        h = (x / 255.0 - self.mean) / self.std
         with chainer.using_config("train", False):  # disable update bn
             h = self.init_block(h)
             h = self.res2(h)
@@ -19,6 +19,9 @@ class TestAverageDistance(unittest.TestCase):
         self.T2 = np.asarray([tf.random_rotation_matrix() for _ in range(5)])
         self.T2[:, :3, 3] = tf.random_vector((5, 3))
         self.T2 = self.T2.astype(np.float32)
+        self.T1s = np.asarray([tf.random_rotation_matrix() for _ in range(5)])
+        self.T1s[:, :3, 3] = tf.random_vector((5, 3))
+        self.T1s = self.T1s.astype(np.float32)
 
     def check_forward(self, points, T1, T2):
         d1 = average_distance(points, T1, T2)
@@ -40,3 +43,28 @@ class TestAverageDistance(unittest.TestCase):
             cuda.to_gpu(self.T1),
             cuda.to_gpu(self.T2),
         )
+
+    def check_forward_stacked(self, points, T1s, T2):
+        d1 = average_distance(points, T1s, T2)
+        d1 = cuda.to_cpu(d1.array)
+        d2 = metrics.average_distance(
+            [cuda.to_cpu(points)] * len(T2),
+            cuda.to_cpu(T1s),
+            cuda.to_cpu(T2),
+        )[0]
+        testing.assert_allclose(d1, d2)
+
+    def test_forward_stacked_cpu(self):
+        self.check_forward_stacked(self.points, self.T1s, self.T2)
+
+    @testing.attr.gpu
+    def test_forward_stacked_gpu(self):
+        self.check_forward_stacked(
+            cuda.to_gpu(self.points),
+            cuda.to_gpu(self.T1s),
+            cuda.to_gpu(self.T2),
+        )
+
+    def test_stacked_symmetric_raises(self):
+        with self.assertRaises(AssertionError):
+            average_distance(self.points, self.T1s, self.T2, symmetric=True)
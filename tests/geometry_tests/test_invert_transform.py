@@ -0,0 +1,14 @@
+import numpy as np
+import trimesh.transformations as tf
+
+from morefusion.geometry import invert_transform
+
+
+def test_invert_transform():
+    T = tf.random_rotation_matrix()
+    T[:3, 3] = tf.random_vector((3,))
+
+    T_inv = invert_transform(T)
+    assert T_inv.shape == (4, 4)
+    np.testing.assert_allclose(T_inv, np.linalg.inv(T), atol=1e-12)
+    np.testing.assert_allclose(T_inv @ T, np.eye(4), atol=1e-12)